@@ -0,0 +1,588 @@
+import os
+import re
+import bisect
+import json
+import logging
+import hashlib
+import itertools
+import math
+import statistics
+import random
+import socket
+import time
+import functools
+import contextvars
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from typing import Optional
+from urllib.parse import urlparse
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# ----------------- Cache helpers -----------------
+# Single-flight: các luồng cùng yêu cầu một key trong lúc đang chạy sẽ chờ chung một Future
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+def _single_flight(key, fn):
+    with _INFLIGHT_LOCK:
+        fut = _INFLIGHT.get(key)
+        leader = fut is None
+        if leader:
+            fut = _INFLIGHT[key] = Future()
+    if not leader:
+        return fut.result()
+    try:
+        result = fn()
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    else:
+        fut.set_result(result)
+        return result
+    finally:
+        with _INFLIGHT_LOCK:
+            del _INFLIGHT[key]
+
+_REVALIDATE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="revalidate")
+
+def _log_revalidate_error(key, future):
+    # Không ai chờ kết quả tính lại ở nền: ghi log lỗi thay vì để Future nuốt mất
+    e = future.exception()
+    if e is not None:
+        logger.error("%s: background revalidate failed", key[0].__qualname__, exc_info=e)
+
+def _revalidate(key, fn):
+    """Chạy _single_flight(key, fn) ở nền; bỏ qua nếu key đang được tính."""
+    with _INFLIGHT_LOCK:
+        if key in _INFLIGHT:
+            return
+    future = _REVALIDATE_POOL.submit(_single_flight, key, fn)
+    future.add_done_callback(functools.partial(_log_revalidate_error, key))
+
+def ttl_cache(seconds: float):
+    """Nhớ kết quả theo tham số trong `seconds` giây; gọi với force=True để bỏ qua cache, .peek() để chỉ đọc cache.
+    Quá hạn chưa tới 2×`seconds` thì trả ngay bản cũ và tính lại ở nền (stale-while-revalidate).
+    Kết quả None không được nhớ; kết quả dựng từ dữ liệu cũ vẫn bị track_stale đánh dấu khi trả từ cache."""
+    def decorator(fn):
+        entries = {}
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(*args, force: bool = False, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            with lock:
+                hit = entries.get(key)
+            def compute():
+                stale_keys = []
+                token = _stale_hits.set(stale_keys)
+                try:
+                    value = fn(*args, **kwargs)
+                finally:
+                    _stale_hits.reset(token)
+                if value is not None:
+                    with lock:
+                        entries[key] = (time.monotonic() + seconds, value, tuple(stale_keys))
+                return value, tuple(stale_keys)
+            now = time.monotonic()
+            if not force and hit and now < hit[0] + seconds:
+                if now >= hit[0]:
+                    # Stale-while-revalidate: hết hạn chưa quá một TTL thì trả ngay bản cũ, tính lại ở nền
+                    _revalidate((wrapper, key), compute)
+                _note_stale(hit[2])
+                return hit[1]
+            value, stale_keys = _single_flight((wrapper, key), compute)
+            _note_stale(stale_keys)
+            return value
+
+        def peek(*args, **kwargs):
+            """Bản mà wrapper còn trả ngay (kể cả trong cửa sổ stale-while-revalidate), hoặc None;
+            không bao giờ tính lại."""
+            with lock:
+                hit = entries.get((args, tuple(sorted(kwargs.items()))))
+            return hit[1] if hit and time.monotonic() < hit[0] + seconds else None
+        wrapper.peek = peek
+        return wrapper
+    return decorator
+
+# ----------------- HTTP -----------------
+# Một Session dùng chung: giữ kết nối keep-alive, không bắt tay TLS lại mỗi request
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = "Mozilla/5.0"
+class _KeepAliveAdapter(HTTPAdapter):
+    """Thêm SO_KEEPALIVE vào socket options mặc định của urllib3 (vốn đã có TCP_NODELAY):
+    kết nối nằm im trong pool giữa các lượt refresh không bị NAT/LB cắt ngầm."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        super().init_poolmanager(*args, **kwargs)
+
+_ADAPTER = _KeepAliveAdapter(pool_connections=16, pool_maxsize=16)
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+
+# Retry: lỗi mạng/timeout và 429/5xx thử lại với exponential backoff + jitter; 4xx khác thì bỏ luôn
+RETRY_ATTEMPTS = 4
+RETRY_BASE = 0.5
+# Tổng thời gian của một _get (mọi lần thử + backoff): không thử lại nếu lần kế tiếp có thể vượt quá
+REQUEST_BUDGET = 25
+# (connect, read): timeout ngắn để còn thời gian thử lại thay vì treo 25s một lần
+REQUEST_TIMEOUT = (5, 10)
+# Khi bị rate limit (429) chỉ một luồng được chờ-thử-lại một lúc, tránh dồn request làm nặng thêm
+_RATE_LIMIT_SEM = threading.Semaphore(1)
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    delay = RETRY_BASE * 2 ** attempt + random.uniform(0, RETRY_BASE)
+    try:
+        return max(delay, float(retry_after))
+    except (TypeError, ValueError):
+        return delay
+
+class TokenBucket:
+    """Giới hạn `rate` request mỗi `per` giây, cho phép dồn tối đa `burst` request."""
+
+    def __init__(self, rate: float, per: float, burst: int):
+        self.rate = rate / per
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Đặt chỗ trước (tokens có thể âm) rồi ngủ ngoài lock: các luồng được phục vụ theo thứ tự
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+# Chỉ giới hạn các host có rate limit chặt (CoinGecko free tier ~10-30 req/phút)
+RATE_LIMITS = {
+    "api.coingecko.com": TokenBucket(10, 60, burst=10),
+    "api.llama.fi": TokenBucket(30, 60, burst=10),
+}
+
+def _get(url: str, timeout=REQUEST_TIMEOUT, retries: int = RETRY_ATTEMPTS, **kwargs):
+    bucket = RATE_LIMITS.get(urlparse(url).hostname)
+    deadline = time.monotonic() + REQUEST_BUDGET
+    per_try = sum(timeout) if isinstance(timeout, tuple) else (timeout or 0)
+    for attempt in range(retries):
+        last = attempt == retries - 1
+        if bucket:
+            bucket.acquire()
+        try:
+            r = SESSION.get(url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            status, delay = None, _backoff_delay(attempt)
+            if last or time.monotonic() + delay + per_try > deadline:
+                raise
+        else:
+            # So status_code trực tiếp: chỉ dựng HTTPError khi thực sự bỏ cuộc
+            status = r.status_code
+            if status < 400:
+                return r
+            r.close()  # với stream=True: trả kết nối về pool trước khi thử lại
+            delay = _backoff_delay(attempt, r.headers.get("Retry-After"))
+            # Retry-After quá dài cũng rơi vào đây: vượt ngân sách thì bỏ cuộc ngay
+            if last or (status != 429 and status < 500) or time.monotonic() + delay + per_try > deadline:
+                r.raise_for_status()
+        if status == 429:
+            with _RATE_LIMIT_SEM:
+                time.sleep(delay)
+        else:
+            time.sleep(delay)
+
+class FileCache:
+    """Cache trên đĩa: mỗi key là một file <md5>.json chứa {body, validators}; ts là mtime của file."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key) -> str:
+        return os.path.join(self.directory, hashlib.md5(repr(key).encode()).hexdigest() + ".json")
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            entry["ts"] = os.path.getmtime(path)
+            return entry
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def get(self, key, ttl: float):
+        entry = self._load(key)
+        if entry and time.time() - entry["ts"] < ttl:
+            return entry
+        return None
+
+    def get_stale(self, key):
+        """Bản lưu gần nhất, bất kể TTL: dùng khi nguồn đang lỗi hoặc để gửi request có điều kiện."""
+        return self._load(key)
+
+    def set(self, key, body, validators: Optional[dict] = None):
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"body": body, "validators": validators}, f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    def touch(self, key):
+        """Gia hạn bản lưu (sau 304 Not Modified) mà không ghi lại body."""
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+FILE_CACHE = FileCache(os.getenv("CACHE_DIR", ".cache"))
+
+# Cache in RAM: {(url, params, as_json): (expiry, body)}, đứng trước FILE_CACHE
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+def _cache_put(key, ttl: float, body, validators: Optional[dict] = None):
+    with _CACHE_LOCK:
+        _CACHE[key] = (time.monotonic() + ttl, body, validators)
+
+def _fresh(key):
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+    return hit[1] if hit and time.monotonic() < hit[0] else None
+
+# Nguồn vừa lỗi: key -> monotonic tới lúc được gọi lại (xem fail_ttl của _safe_get)
+_FAILED = {}
+
+def _safe_get(url: str, ttl: float = 0, as_json: bool = True, until=None, fail_ttl: float = 0, **kwargs):
+    """fail_ttl: nguồn lỗi thì không gọi lại trong fail_ttl giây, trả bản lưu cũ (hoặc None)."""
+    key = (url, tuple(sorted(kwargs.get("params", {}).items())), as_json)
+    if ttl:
+        hit = _fresh(key)
+        if hit is not None:
+            return hit
+        entry = FILE_CACHE.get(key, ttl)
+        if entry is not None:
+            # Chỉ giữ trong RAM phần TTL còn lại của bản trên đĩa
+            _cache_put(key, ttl - (time.time() - entry["ts"]), entry["body"], entry.get("validators"))
+            return entry["body"]
+    if fail_ttl and time.monotonic() < _FAILED.get(key, 0):
+        body = _last_entry(key)[0] if ttl else None
+        if body is not None:
+            _note_stale((key,))
+        return body
+    body, stale = _single_flight(key, lambda: _fetch(key, url, ttl, as_json, until, **kwargs))
+    if fail_ttl and (stale or body is None):
+        _FAILED[key] = time.monotonic() + fail_ttl
+    if stale:
+        _note_stale((key,))
+    return body
+
+def _read_until(r, pattern: re.Pattern, anchor: str, chunk_size: int = 16384) -> str:
+    """Đọc body theo từng chunk, dừng khi pattern đã khớp sau anchor; phần còn lại của trang không tải."""
+    r.encoding = r.encoding or "utf-8"
+    text, start = "", -1
+    try:
+        for chunk in r.iter_content(chunk_size, decode_unicode=True):
+            text += chunk
+            if start < 0:
+                # anchor có thể nằm vắt qua hai chunk
+                start = text.find(anchor, max(len(text) - len(chunk) - len(anchor), 0))
+            if start >= 0 and pattern.search(text, start):
+                break
+    finally:
+        r.close()
+    return text
+
+def _fetch(key, url: str, ttl: float, as_json: bool, until=None, **kwargs):
+    """Trả (body, stale). Nguồn lỗi thì dùng bản lưu cuối cùng (nếu có) với stale=True.
+    until=(pattern, anchor): chỉ đọc trang HTML tới khi pattern khớp (xem _read_until)."""
+    if ttl:
+        # Luồng khác có thể vừa fetch xong giữa lúc ta kiểm tra cache và vào single-flight
+        hit = _fresh(key)
+        if hit is not None:
+            return hit, False
+    last_body, validators = _last_entry(key) if ttl else (None, None)
+    if last_body is None:
+        validators = None
+    try:
+        # Có ETag/Last-Modified từ lần trước thì hỏi có điều kiện: 304 không kèm body
+        r = _get(url, stream=until is not None, headers=validators, **kwargs)
+        if r.status_code == 304:
+            r.close()
+            body = last_body
+        elif as_json:
+            body = _json_loads(r.content)
+        else:
+            body = _read_until(r, *until) if until else r.text
+    except (requests.RequestException, ValueError) as e:
+        if not ttl:
+            # Không cache: thường là nguồn dự phòng, lỗi là chuyện bình thường
+            logger.debug("fetch failed %s: %s", url, e)
+            return None, False
+        logger.warning("fetch failed %s: %s%s", url, e, "" if last_body is None else " (serving last cached copy)")
+        return last_body, last_body is not None
+    if ttl:
+        if r.status_code == 304:
+            # Body không đổi: validators cũ vẫn đúng; trên đĩa chỉ gia hạn, không ghi lại body
+            _cache_put(key, ttl, body, _validators(r) or validators)
+            FILE_CACHE.touch(key)
+        else:
+            # Body mới chỉ đi với validators của chính response này (không có thì thôi hỏi có điều kiện)
+            validators = _validators(r)
+            _cache_put(key, ttl, body, validators)
+            FILE_CACHE.set(key, body, validators)
+    return body, False
+
+def _last_entry(key):
+    """(body, validators) của bản lưu gần nhất, bất kể TTL; (None, None) nếu chưa có."""
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+    if hit:
+        return hit[1], hit[2]
+    entry = FILE_CACHE.get_stale(key)
+    return (entry["body"], entry.get("validators")) if entry else (None, None)
+
+def _validators(r) -> Optional[dict]:
+    """Header cho request có điều kiện lần sau, lấy từ ETag/Last-Modified của response."""
+    v = {}
+    if r.headers.get("ETag"):
+        v["If-None-Match"] = r.headers["ETag"]
+    if r.headers.get("Last-Modified"):
+        v["If-Modified-Since"] = r.headers["Last-Modified"]
+    return v or None
+
+# Các key đã phải dùng dữ liệu cũ trong lượt gọi hiện tại (xem track_stale)
+_stale_hits = contextvars.ContextVar("stale_hits", default=None)
+
+def _note_stale(keys):
+    hits = _stale_hits.get()
+    if hits is not None and keys:
+        hits.extend(keys)
+
+def track_stale(fn):
+    """Gọi fn(); trả (kết quả, True nếu có nguồn nào phải dùng dữ liệu cũ)."""
+    hits = []
+    token = _stale_hits.set(hits)
+    try:
+        return fn(), bool(hits)
+    finally:
+        _stale_hits.reset(token)
+
+def _submit(pool, fn, *args, **kwargs):
+    """pool.submit giữ contextvars của luồng gọi, để track_stale thấy cả request chạy ở pool khác."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def _safe_get_json(url: str, ttl: float = 0, **kwargs):
+    return _safe_get(url, ttl, True, **kwargs)
+
+def _safe_get_text(url: str, ttl: float = 0, until=None, **kwargs):
+    return _safe_get(url, ttl, False, until, **kwargs)
+
+# ----------------- Data fetchers -----------------
+# Regex cho các đường scrape HTML, compile một lần khi load module
+# [^>]*? phải lazy: bản greedy nuốt mất các chữ số đầu ("+12.5 M" → 5)
+_RE_NETFLOW = re.compile(r'Netflow[^>]*?\+?(-?\d+(?:\.\d+)?)\s*M')
+_RE_SEASON = re.compile(r'font-size:88px;[^>]*>(\d{1,3})<')
+
+def _search_near(pattern: re.Pattern, html: str, anchor: str, span: int = 8192):
+    """Chạy regex trong cửa sổ bắt đầu từ anchor (str.find) thay vì cả trang; không thấy thì quét cả trang"""
+    i = html.find(anchor)
+    if i < 0:
+        return None
+    return pattern.search(html, i, i + span) or pattern.search(html, i)
+
+# Lỗi khi đọc payload sai dạng (thiếu key, None, list rỗng, chuỗi không phải số)
+_DATA_ERRORS = (KeyError, IndexError, TypeError, ValueError)
+
+def get_global_from_coingecko():
+    """Phần `data` của CoinGecko /global; các chỉ số dưới đây dùng chung một request đã cache."""
+    data = _safe_get_json("https://api.coingecko.com/api/v3/global", ttl=120)
+    return data.get("data") if isinstance(data, dict) else None
+
+def get_btc_dominance():
+    g = get_global_from_coingecko()
+    try:
+        return float(g["market_cap_percentage"]["btc"])
+    except _DATA_ERRORS:
+        return None
+
+def get_total_market_cap_usd():
+    g = get_global_from_coingecko()
+    try:
+        return float(g["total_market_cap"]["usd"])
+    except _DATA_ERRORS:
+        return None
+
+def get_altcoin_market_cap_est():
+    g = get_global_from_coingecko()
+    try:
+        total = float(g["total_market_cap"]["usd"])
+        btc_pct = float(g["market_cap_percentage"]["btc"])
+        return max(total - total * btc_pct / 100, 0.0)
+    except _DATA_ERRORS:
+        return None
+
+def get_eth_btc_change_7d_pct():
+    url = "https://api.coingecko.com/api/v3/coins/markets"
+    params = {"vs_currency": "btc", "ids": "ethereum", "price_change_percentage": "7d"}
+    data = _safe_get_json(url, ttl=120, params=params)
+    try:
+        return float(data[0]["price_change_percentage_7d_in_currency"])
+    except _DATA_ERRORS:
+        return None
+
+def _utc_midnight_ts() -> int:
+    # Số học nguyên thay cho utcnow().replace(...).timestamp(): vừa rẻ hơn, vừa không bị
+    # lệch múi giờ (timestamp() của datetime naive hiểu nó là giờ local của máy)
+    return int(time.time()) // 86400 * 86400
+
+def _compute_7d_change_from_series(series, today_ts: Optional[int] = None):
+    """series: list of dict with date(int, seconds) and tvl(float), sorted by date"""
+    if not series or len(series) < 8:
+        return None
+    if today_ts is None:
+        today_ts = _utc_midnight_ts()
+    date_of = lambda p: p["date"]
+    # Điểm cuối cùng có date <= hôm nay: O(log n), không phải copy cả chuỗi nhiều năm
+    end = bisect.bisect_right(series, today_ts, key=date_of)
+    if end < 8:
+        return None
+    last = series[end - 1]
+    # Điểm gần mốc last - 7 ngày nhất (chuỗi có thể thiếu ngày nên không lấy cứng end - 8)
+    target = last["date"] - 7 * 86400
+    i = bisect.bisect_left(series, target, 0, end - 1, key=date_of)
+    if i > 0 and (i == end - 1 or target - series[i - 1]["date"] <= series[i]["date"] - target):
+        i -= 1
+    last_val = float(last["tvl"])
+    prev_val = float(series[i]["tvl"])
+    if prev_val != 0:
+        return (last_val - prev_val) / prev_val * 100
+    return None
+
+@ttl_cache(seconds=900)
+def get_defi_tvl_change_7d_pct():
+    # Nguồn lỗi thì _safe_get_json trả chuỗi lưu lần cuối (memory/.cache), không cần scrape HTML/CSV
+    data = _safe_get_json("https://api.llama.fi/v2/historicalChainTvl", ttl=600)
+    if not isinstance(data, list):
+        return None
+    try:
+        return _compute_7d_change_from_series(data, _utc_midnight_ts())
+    except _DATA_ERRORS:
+        return None
+
+@ttl_cache(seconds=120)
+def get_funding_rate_avg():
+    url = "https://fapi.binance.com/fapi/v1/premiumIndex"
+    data = _safe_get_json(url, ttl=300)
+    if not isinstance(data, list):
+        return None
+    # Một số hợp đồng trả lastFundingRate rỗng: bỏ qua
+    rates = (float(x["lastFundingRate"]) for x in data if x.get("lastFundingRate"))
+    try:
+        # fmean đếm và cộng (fsum) ngay trên generator, không dựng list trung gian
+        return statistics.fmean(rates)
+    except _DATA_ERRORS + (AttributeError,):  # gồm StatisticsError (lớp con của ValueError) khi không có dữ liệu
+        return None
+
+def get_stablecoin_netflow_cex_usd():
+    # Số liệu netflow cập nhật chậm: cache body 5 phút, nguồn lỗi thì dùng bản lưu cuối
+    try:
+        js = _safe_get_json("https://whaleportal.com/api/stablecoin-netflows", ttl=300)
+        if isinstance(js, list) and js:
+            latest = js[-1]
+            if "netflow" in latest:
+                return float(latest["netflow"]) / 1_000_000
+    except _DATA_ERRORS:
+        pass
+    # until: tải trang tới khi thấy số cần lấy rồi cắt kết nối
+    html = _safe_get_text("https://whaleportal.com/stablecoin-netflows", ttl=300,
+                          until=(_RE_NETFLOW, "Netflow"))
+    if html:
+        m = _search_near(_RE_NETFLOW, html, "Netflow")
+        if m:
+            try:
+                return float(m.group(1))
+            except _DATA_ERRORS:
+                pass
+    return None
+
+# Số trang markets (250 coin/trang): top 250 đã gồm gần hết volume alt, các trang sau chỉ
+# đổi tỉ lệ ở số lẻ thập phân mà tốn thêm request + ~500KB JSON mỗi trang. Cần đủ hơn thì tăng lên
+MARKETS_PAGES = max(1, int(os.getenv("MARKETS_PAGES", "1")))  # ThreadPoolExecutor cần ít nhất 1 worker
+_PAGE_POOL = ThreadPoolExecutor(max_workers=MARKETS_PAGES, thread_name_prefix="markets")
+
+# Bật để tính từ các trang markets (tốn MARKETS_PAGES request); mặc định dùng /global + /simple/price
+ACCURATE_VOLUME_RATIO = os.getenv("ACCURATE_VOLUME_RATIO", "") == "1"
+
+def get_alt_btc_spot_volume_ratio():
+    if ACCURATE_VOLUME_RATIO:
+        return _alt_btc_volume_ratio_from_markets()
+    # Tổng volume 24h lấy từ /global đã cache, volume 24h thật của BTC từ /simple/price (payload vài byte)
+    g = get_global_from_coingecko()
+    params = {"ids": "bitcoin", "vs_currencies": "usd", "include_24hr_vol": "true"}
+    price = _safe_get_json("https://api.coingecko.com/api/v3/simple/price", ttl=120, params=params)
+    try:
+        total_vol = float(g["total_volume"]["usd"])
+        btc_vol = float(price["bitcoin"]["usd_24h_vol"])
+        return (total_vol - btc_vol) / btc_vol if btc_vol > 0 else None
+    except _DATA_ERRORS:
+        return None
+
+def _alt_btc_volume_ratio_from_markets():
+    base_url = "https://api.coingecko.com/api/v3/coins/markets"
+    page_params = [{"vs_currency": "usd", "order": "market_cap_desc", "per_page": 250, "page": p}
+                   for p in range(1, MARKETS_PAGES + 1)]
+    futures = [_submit(_PAGE_POOL, _safe_get_json, base_url, 120, params=params) for params in page_params]
+    # Dừng ở trang rỗng/lỗi đầu tiên như trước
+    coins = [c for page in itertools.takewhile(bool, (f.result() for f in futures)) for c in page]
+    # id là duy nhất và bitcoin đứng đầu theo market cap: next() dừng ngay phần tử đầu
+    btc_vol = next((float(c.get("total_volume") or 0) for c in coins if c.get("id") == "bitcoin"), 0.0)
+    total_vol = math.fsum(float(c.get("total_volume") or 0) for c in coins)
+    return (total_vol - btc_vol) / btc_vol if btc_vol > 0 else None
+
+# API JSON của blockchaincenter: hỏng thì bỏ nhanh (một lần thử) để còn fallback HTML,
+# và không hỏi lại trong SEASON_API_FAIL_TTL giây
+SEASON_API_TIMEOUT = (3, 8)
+SEASON_API_FAIL_TTL = 600
+
+@ttl_cache(seconds=1800)
+def get_altcoin_season_index():
+    try:
+        data = _safe_get_json("https://api.blockchaincenter.net/api/altcoin-season", ttl=900,
+                              timeout=SEASON_API_TIMEOUT, retries=1, fail_ttl=SEASON_API_FAIL_TTL)
+        if data and "index" in data:
+            return int(round(float(data["index"])))
+    except _DATA_ERRORS:
+        pass
+    try:
+        data = _safe_get_json("https://api.blockchaincenter.net/api/altcoin-season-index", ttl=900,
+                              timeout=SEASON_API_TIMEOUT, retries=1, fail_ttl=SEASON_API_FAIL_TTL)
+        if data and isinstance(data, dict) and "index" in data:
+            return int(round(float(data["index"])))
+    except _DATA_ERRORS:
+        pass
+    html = _safe_get_text("https://www.blockchaincenter.net/altcoin-season-index/", ttl=900,
+                          until=(_RE_SEASON, "font-size:88px;"))
+    if html:
+        m = _search_near(_RE_SEASON, html, "font-size:88px;")
+        if m:
+            val = int(m.group(1))
+            if 0 <= val <= 100:
+                return val
+    return None
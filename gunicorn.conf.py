@@ -0,0 +1,11 @@
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+# Một worker: bot Telegram và job queue sống trong process này (nhiều worker = gửi báo cáo nhiều lần)
+workers = 1
+worker_class = "gthread"
+threads = 8
+
+def post_worker_init(worker):
+    from main import start_bot_thread
+    start_bot_thread()
@@ -0,0 +1,157 @@
+import math
+import logging
+import time
+import datetime as dt
+from zoneinfo import ZoneInfo
+from typing import Callable, NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from fetchers import (
+    ttl_cache,
+    track_stale,
+    get_btc_dominance,
+    get_total_market_cap_usd,
+    get_altcoin_market_cap_est,
+    get_eth_btc_change_7d_pct,
+    get_defi_tvl_change_7d_pct,
+    get_funding_rate_avg,
+    get_stablecoin_netflow_cex_usd,
+    get_alt_btc_spot_volume_ratio,
+    get_altcoin_season_index,
+)
+
+logger = logging.getLogger(__name__)
+
+HCM_TZ = ZoneInfo("Asia/Ho_Chi_Minh")
+
+# ----------------- Helpers -----------------
+_now_minute = (None, "")
+
+def _now_str() -> str:
+    """Giờ HCM dạng 'YYYY-mm-dd HH:MM'; chỉ format lại khi sang phút mới."""
+    global _now_minute
+    minute = int(time.time() // 60)
+    if _now_minute[0] != minute:
+        _now_minute = (minute, dt.datetime.fromtimestamp(minute * 60, HCM_TZ).strftime("%Y-%m-%d %H:%M"))
+    return _now_minute[1]
+
+def _fmt_usd(n: Optional[float]) -> str:
+    if n is None or not math.isfinite(n):
+        return "N/A"
+    return "$" + format(n, ",.0f" if n >= 1_000_000 else ",.2f")
+
+# ----------------- Report -----------------
+FETCHERS = (
+    get_btc_dominance,
+    get_total_market_cap_usd,
+    get_altcoin_market_cap_est,
+    get_eth_btc_change_7d_pct,
+    get_defi_tvl_change_7d_pct,
+    get_funding_rate_avg,
+    get_stablecoin_netflow_cex_usd,
+    get_alt_btc_spot_volume_ratio,
+    get_altcoin_season_index,
+)
+_FETCH_POOL = ThreadPoolExecutor(max_workers=len(FETCHERS), thread_name_prefix="fetch")
+
+class ReportRow(NamedTuple):
+    template: str                          # format_map với {v} (đã qua fmt) và {mark}
+    na: str                                # dòng hiển thị khi không có dữ liệu
+    fmt: Optional[Callable] = None
+    mark: Callable = lambda v: ""
+
+    def render(self, v, stale: bool = False) -> str:
+        if v is None:
+            return self.na
+        line = self.template.format_map({"v": self.fmt(v) if self.fmt else v, "mark": self.mark(v)})
+        return line.rstrip() + " ⏱" if stale else line
+
+# Cùng thứ tự với FETCHERS
+REPORT_ROWS = (
+    ReportRow("1️⃣ BTC Dominance: {v:.2f}% 🧊", "1️⃣ BTC Dominance: N/A 🧊"),
+    ReportRow("2️⃣ Total Market Cap: {v} 💰", "2️⃣ Total Market Cap: N/A 💰", fmt=_fmt_usd),
+    ReportRow("3️⃣ Altcoin Market Cap (est): {v} 🔷", "3️⃣ Altcoin Market Cap (est): N/A 🔷", fmt=_fmt_usd),
+    ReportRow("4️⃣ ETH/BTC 7d change: {v:+.2f}% {mark}", "4️⃣ ETH/BTC 7d change: N/A",
+              mark=lambda v: "✅" if v > 3 else ""),
+    ReportRow("5️⃣ DeFi TVL 7d change: {v:+.2f}% 🧭", "5️⃣ DeFi TVL 7d change: N/A 🧭"),
+    ReportRow("6️⃣ Funding Rate avg: {v:+.6f} {mark}", "6️⃣ Funding Rate avg: N/A",
+              mark=lambda v: "📈" if v >= 0 else "📉"),
+    ReportRow("7️⃣ Stablecoin Netflow (CEX): {v:+.0f} M {mark}", "7️⃣ Stablecoin Netflow (CEX): N/A",
+              mark=lambda v: "🔼" if v >= 0 else "🔽"),
+    ReportRow("8️⃣ Alt/BTC Volume Ratio: {v:.2f} {mark}", "8️⃣ Alt/BTC Volume Ratio: N/A",
+              mark=lambda v: "✅" if v > 1.5 else ""),
+    ReportRow("9️⃣ Altcoin Season Index (BC): {v} {mark}", "9️⃣ Altcoin Season Index (BC): N/A",
+              mark=lambda v: "🟢" if v > 75 else ""),
+)
+REPORT_HEADER = "📊 <b>Crypto Daily Report</b> — {now} (GMT+7)"
+
+class Signal(NamedTuple):
+    fetcher: Callable                      # lấy giá trị từ kết quả của fetcher này trong FETCHERS
+    label: str
+    active: Callable                       # gọi với giá trị khác None
+
+    def line(self, on: bool) -> str:
+        return ("✅ " if on else "❌ ") + self.label
+
+SIGNAL_SPECS = (
+    Signal(get_eth_btc_change_7d_pct, "ETH/BTC > +3% (7d)", lambda v: v > 3),
+    Signal(get_funding_rate_avg, "Funding Rate dương", lambda v: v > 0),
+    Signal(get_stablecoin_netflow_cex_usd, "Stablecoin Netflow > 0", lambda v: v > 0),
+    Signal(get_alt_btc_spot_volume_ratio, "Alt/BTC Volume Ratio > 1.5", lambda v: v > 1.5),
+    Signal(get_altcoin_season_index, "Altcoin Season Index > 75", lambda v: v > 75),
+)
+_SIGNAL_INDEX = tuple(FETCHERS.index(s.fetcher) for s in SIGNAL_SPECS)
+# Vị trí tín hiệu Altcoin Season Index (quyết định mức "Confirmed"), tra theo fetcher chứ không theo thứ tự
+_SEASON_SIGNAL = [s.fetcher for s in SIGNAL_SPECS].index(get_altcoin_season_index)
+LEVEL_LINES = {
+    "Altseason Confirmed": "🔥 <b>Altseason Confirmed</b> — khả năng trong ~1–2 tuần",
+    "Strong Signal": "🔥 <b>Strong Signal</b> — nhiều điều kiện đã kích hoạt",
+    "Early Signal": "🔥 <b>Early Signal</b> — đang hình thành, cần theo dõi",
+}
+# Phần chữ cố định cuối báo cáo: dựng một lần lúc import
+REPORT_NOTES = ("", "— <i>Ghi chú</i>:", "• Stablecoin netflow dương ⇒ dòng tiền sắp giải ngân.",
+                "• Alt/BTC volume ratio > 1.5 ⇒ altcoin volume vượt BTC.",
+                "• Altseason Index > 75 ⇒ xu hướng altseason rõ ràng.")
+STALE_NOTE = "• ⏱ ⇒ nguồn đang lỗi, hiển thị số liệu gần nhất."
+REPORT_FOOTER = "<i>Code by: HNT</i>"
+
+def _run_fetcher(fn):
+    # Một nguồn lỗi bất ngờ chỉ làm dòng đó thành N/A, không làm hỏng cả báo cáo
+    try:
+        return track_stale(fn)
+    except Exception:
+        logger.exception("%s failed", fn.__name__)
+        return None, False
+
+@ttl_cache(seconds=60)
+def build_report():
+    now = _now_str()
+    # Các fetcher độc lập, chạy song song: tổng thời gian ≈ request chậm nhất
+    futures = [_FETCH_POOL.submit(_run_fetcher, f) for f in FETCHERS]
+    values, stale = zip(*(f.result() for f in futures))
+
+    signals = [values[i] is not None and bool(s.active(values[i])) for s, i in zip(SIGNAL_SPECS, _SIGNAL_INDEX)]
+    count_active = sum(signals)
+    s_index = signals[_SEASON_SIGNAL]
+
+    level = None
+    if count_active >= 4 and s_index:
+        level = "Altseason Confirmed"
+    elif count_active >= 4:
+        level = "Strong Signal"
+    elif 2 <= count_active <= 3:
+        level = "Early Signal"
+
+    lines = [REPORT_HEADER.format(now=now), ""]
+    lines.extend(row.render(v, st) for row, v, st in zip(REPORT_ROWS, values, stale))
+
+    lines += ["", "— <b>Tín hiệu kích hoạt</b>:"]
+    lines.extend(s.line(on) for s, on in zip(SIGNAL_SPECS, signals))
+
+    if level:
+        lines += ("", "— <b>Cảnh báo Altseason</b>:", LEVEL_LINES[level])
+
+    lines += REPORT_NOTES
+    if any(stale):
+        lines.append(STALE_NOTE)
+    lines.append(REPORT_FOOTER)
+    return "\n".join(lines)